@@ -2,14 +2,33 @@
 """Analyze phase relationship between paired devices."""
 
 import re
+from array import array
+from bisect import bisect_left, bisect_right
 from datetime import datetime
+from itertools import islice
 
-def parse_log(filename):
-    """Extract activation timestamps and role from log file."""
-    activations = []
+# Regex patterns for motor activation log lines
+MOTOR_CYCLE_PATTERN = re.compile(
+    r'I \((\d+)\) MOTOR_TASK: (SERVER|CLIENT): Cycle starts (ACTIVE|INACTIVE)'
+)
+
+# Display names indexed by ACTIVE flag (0=INACTIVE, 1=ACTIVE)
+STATE_NAMES = ('INACTIVE', 'ACTIVE')
+
+def parse_log(filename, encoding='utf-8'):
+    """Extract activation timestamps and role from log file.
+
+    Paired-device captures are plain UTF-8, so no BOM detection is done;
+    pass encoding to read a log saved in another format.
+
+    Activations are returned as parallel arrays: timestamps (ms) and
+    ACTIVE flags (1=ACTIVE, 0=INACTIVE).
+    """
+    timestamps = array('q')
+    active_flags = bytearray()
     device_role = None
     
-    with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
+    with open(filename, 'r', encoding=encoding, errors='ignore') as f:
         for line in f:
             # Extract role from connection logs
             if 'CLIENT role assigned' in line or 'SERVER role assigned' in line:
@@ -19,36 +38,45 @@ def parse_log(filename):
                     device_role = 'SERVER'
             
             # Extract motor activations
-            match = re.search(r'I \((\d+)\) MOTOR_TASK: (SERVER|CLIENT): Cycle starts (ACTIVE|INACTIVE)', line)
+            match = MOTOR_CYCLE_PATTERN.search(line)
             if match:
-                timestamp_ms = int(match.group(1))
-                role = match.group(2)
-                state = match.group(3)
-                activations.append({
-                    'timestamp_ms': timestamp_ms,
-                    'role': role,
-                    'state': state
-                })
+                timestamps.append(int(match.group(1)))
+                active_flags.append(match.group(3) == 'ACTIVE')
     
-    return activations, device_role
+    return timestamps, active_flags, device_role
+
+def find_closest_index(sorted_ts, target):
+    """Return index of the timestamp closest to target in a sorted list.
+
+    Ties resolve to the earlier timestamp, matching min() over the same list.
+    """
+    idx = bisect_left(sorted_ts, target)
+    if idx == 0:
+        return 0
+    if idx == len(sorted_ts):
+        return bisect_left(sorted_ts, sorted_ts[-1])
+    before = sorted_ts[idx - 1]
+    if target - before <= sorted_ts[idx] - target:
+        return bisect_left(sorted_ts, before)
+    return idx
 
 def analyze_phase_relationship(log_a, log_b):
     """Compare activation timing between two devices."""
-    act_a, role_a = parse_log(log_a)
-    act_b, role_b = parse_log(log_b)
+    ts_a, flags_a, role_a = parse_log(log_a)
+    ts_b, flags_b, role_b = parse_log(log_b)
     
     print("=" * 70)
     print("Phase Relationship Analysis - Paired Devices")
     print("=" * 70)
     print(f"\nDevice A: {log_a}")
     print(f"  Role: {role_a}")
-    print(f"  Activations: {len(act_a)}")
+    print(f"  Activations: {len(ts_a)}")
     print(f"\nDevice B: {log_b}")
     print(f"  Role: {role_b}")
-    print(f"  Activations: {len(act_b)}")
+    print(f"  Activations: {len(ts_b)}")
     print()
     
-    if len(act_a) == 0 or len(act_b) == 0:
+    if len(ts_a) == 0 or len(ts_b) == 0:
         print("ERROR: No activations found in one or both logs")
         return
     
@@ -59,15 +87,19 @@ def analyze_phase_relationship(log_a, log_b):
     print(f"{'Time (s)':<10} {'Dev A State':<15} {'Dev B State':<15} {'Phase Diff (ms)':<18}")
     print("-" * 70)
     
+    # Sort Device B once so closest-activation lookups can binary search
+    order_b = sorted(range(len(ts_b)), key=ts_b.__getitem__)
+    sorted_ts_b = [ts_b[j] for j in order_b]
+
     # Use Device A timestamps as reference
-    for i in range(min(20, len(act_a))):
-        time_a = act_a[i]['timestamp_ms']
-        state_a = act_a[i]['state']
+    for i in range(min(20, len(ts_a))):
+        time_a = ts_a[i]
+        state_a = STATE_NAMES[flags_a[i]]
         
         # Find closest activation in Device B
-        closest_b = min(act_b, key=lambda x: abs(x['timestamp_ms'] - time_a))
-        time_b = closest_b['timestamp_ms']
-        state_b = closest_b['state']
+        j = order_b[find_closest_index(sorted_ts_b, time_a)]
+        time_b = ts_b[j]
+        state_b = STATE_NAMES[flags_b[j]]
         
         phase_diff = time_b - time_a
         
@@ -84,28 +116,26 @@ def analyze_phase_relationship(log_a, log_b):
     print("ACTIVE State Phase Analysis (First 50 cycles):")
     print("=" * 70)
     
-    active_a = [a for a in act_a if a['state'] == 'ACTIVE'][:50]
-    active_b = [a for a in act_b if a['state'] == 'ACTIVE'][:50]
+    # Stop scanning once the first 50 ACTIVE cycles are found
+    active_a = list(islice((t for t, active in zip(ts_a, flags_a) if active), 50))
+    active_b = list(islice((t for t, active in zip(ts_b, flags_b) if active), 50))
     
     in_phase_count = 0
     antiphase_count = 0
-    phase_errors = []
+    phase_errors = []  # Tuples of (time_s, diff_ms) for IN-PHASE cycles
+    active_ts_b = sorted(active_b)
     
-    for act in active_a:
-        time_a = act['timestamp_ms']
-        
+    for time_a in active_a:
         # Find any Device B ACTIVE within ±100ms
-        nearby_b = [b for b in active_b if abs(b['timestamp_ms'] - time_a) < 100]
+        lo = bisect_right(active_ts_b, time_a - 100)
+        hi = bisect_left(active_ts_b, time_a + 100)
+        nearby_b = active_ts_b[lo:hi]
         
         if nearby_b:
             # Device B is ACTIVE at same time - IN-PHASE ERROR
             in_phase_count += 1
-            closest = min(nearby_b, key=lambda x: abs(x['timestamp_ms'] - time_a))
-            phase_errors.append({
-                'time_s': time_a / 1000,
-                'diff_ms': closest['timestamp_ms'] - time_a,
-                'type': 'IN-PHASE'
-            })
+            closest = min(nearby_b, key=lambda ts: abs(ts - time_a))
+            phase_errors.append((time_a / 1000, closest - time_a))
         else:
             antiphase_count += 1
     
@@ -117,8 +147,8 @@ def analyze_phase_relationship(log_a, log_b):
         print(f"\n⚠️  CRITICAL: Devices are activating IN-PHASE!")
         print("\nFirst 10 IN-PHASE errors:")
         print(f"{'Time (s)':<10} {'Phase Diff (ms)':<18}")
-        for err in phase_errors[:10]:
-            print(f"{err['time_s']:<10.1f} {err['diff_ms']:>6} ms")
+        for time_s, diff_ms in phase_errors[:10]:
+            print(f"{time_s:<10.1f} {diff_ms:>6} ms")
     else:
         print("\n✓ Devices are correctly in ANTIPHASE")
     
@@ -131,8 +161,8 @@ def analyze_phase_relationship(log_a, log_b):
     
     if len(active_a) > 0 and len(active_b) > 0:
         # Calculate actual phase offset
-        first_a = active_a[0]['timestamp_ms']
-        first_b = active_b[0]['timestamp_ms']
+        first_a = active_a[0]
+        first_b = active_b[0]
         actual_offset = abs(first_b - first_a)
         
         print(f"\nActual offset: {actual_offset} ms")
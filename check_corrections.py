@@ -3,27 +3,26 @@
 
 import sys
 
-with open('correction_search_results.txt', 'w', encoding='utf-8') as out:
-    with open('serial_log_dev_b_1747-20251201.txt', 'r', encoding='utf-16-le', errors='ignore') as f:
-        count = 0
-        for line in f:
-            if 'CORRECTION COMPARE' in line or 'correction' in line.lower():
-                out.write(line.strip() + '\n')
-                count += 1
-                if count >= 30:
-                    break
+# Single pass over the log collecting both result sets
+correction_lines = []
+rtt_lines = []
+with open('serial_log_dev_b_1747-20251201.txt', 'r', encoding='utf-16-le', errors='ignore') as f:
+    for line in f:
+        if len(correction_lines) < 30 and ('CORRECTION COMPARE' in line or 'correction' in line.lower()):
+            correction_lines.append(line.strip())
+        if len(rtt_lines) < 10 and 'RTT measured' in line:
+            rtt_lines.append(line.strip())
+        if len(correction_lines) >= 30 and len(rtt_lines) >= 10:
+            break
 
-        if count == 0:
-            out.write("No CORRECTION COMPARE logs found in CLIENT log.\n")
-            out.write("\nSearching for RTT-related logs instead...\n\n")
+# Build output in memory and write it once
+output = [line + '\n' for line in correction_lines]
+if not correction_lines:
+    output.append("No CORRECTION COMPARE logs found in CLIENT log.\n")
+    output.append("\nSearching for RTT-related logs instead...\n\n")
+output.extend(line + '\n' for line in rtt_lines)
 
-    with open('serial_log_dev_b_1747-20251201.txt', 'r', encoding='utf-16-le', errors='ignore') as f:
-        count = 0
-        for line in f:
-            if 'RTT measured' in line:
-                out.write(line.strip() + '\n')
-                count += 1
-                if count >= 10:
-                    break
+with open('correction_search_results.txt', 'w', encoding='utf-8') as out:
+    out.write(''.join(output))
 
 print("Search complete. Results saved to correction_search_results.txt")
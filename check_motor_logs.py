@@ -1,28 +1,34 @@
 #!/usr/bin/env python3
 """Check motor task logs in CLIENT serial output."""
 
-with open('motor_log_results.txt', 'w', encoding='utf-8') as out:
-    with open('serial_log_dev_b_1747-20251201.txt', 'r', encoding='utf-16-le', errors='ignore') as f:
-        count = 0
-        for line in f:
-            if 'MOTOR_TASK' in line and ('CATCH-UP' in line or 'INACTIVE' in line or 'calculated' in line or 'wait=' in line):
-                out.write(line.strip() + '\n')
-                count += 1
-                if count >= 50:
-                    break
+import re
 
-        if count == 0:
-            out.write("No MOTOR_TASK drift/wait logs found.\n")
-            out.write("\nSearching for any MOTOR_TASK logs...\n\n")
+# Drift/wait tags of interest, matched in one regex sweep per line
+DRIFT_TAG_PATTERN = re.compile(r'CATCH-UP|INACTIVE|calculated|wait=')
 
+# Single pass: collect drift/wait logs, plus any MOTOR_TASK logs as a fallback
+specific = []
+generic = []
+
+with open('serial_log_dev_b_1747-20251201.txt', 'r', encoding='utf-16-le', errors='ignore') as f:
+    for line in f:
+        if 'MOTOR_TASK' in line:
+            if DRIFT_TAG_PATTERN.search(line):
+                specific.append(line.strip())
+                if len(specific) >= 50:
+                    break
+            elif len(generic) < 30:
+                generic.append(line.strip())
+
+# Collect results in memory and write them once at the end
+if specific:
+    results = specific
+else:
     # If no drift logs, show any MOTOR_TASK logs
-    if count == 0:
-        with open('serial_log_dev_b_1747-20251201.txt', 'r', encoding='utf-16-le', errors='ignore') as f:
-            for line in f:
-                if 'MOTOR_TASK' in line:
-                    out.write(line.strip() + '\n')
-                    count += 1
-                    if count >= 30:
-                        break
+    results = ["No MOTOR_TASK drift/wait logs found.",
+               "\nSearching for any MOTOR_TASK logs...\n"] + generic
+
+with open('motor_log_results.txt', 'w', encoding='utf-8') as out:
+    out.write('\n'.join(results) + '\n')
 
 print("Search complete. Results saved to motor_log_results.txt")
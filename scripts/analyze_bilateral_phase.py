@@ -9,52 +9,152 @@ KEY FIX: Only counts "Cycle starts ACTIVE" for both devices, ignoring CLIENT's
 "Cycle starts INACTIVE" which is not a motor activation.
 """
 
+import codecs
 import re
 import sys
 import statistics
+from bisect import bisect_left
+from collections import Counter
+
+# Regex patterns (applied to raw ASCII bytes with all spaces removed)
+EPOCH_PATTERN = re.compile(rb'Motorepochset:(\d+)us,cycle:(\d+)ms')
+ACTIVE_PATTERN = re.compile(rb'I\((\d+)\)MOTOR_TASK:.*CyclestartsACTIVE')
+
+# Encodings the byte-level scan understands (names as normalized by codecs.lookup):
+# ASCII-compatible logs are scanned as-is, UTF-16 LE logs via their low bytes
+# (generic 'utf-16' is accepted unless the file has a big-endian BOM)
+ASCII_COMPATIBLE_CODECS = ('utf-8', 'utf-8-sig', 'ascii')
+UTF16_LE_CODECS = ('utf-16-le', 'utf-16')
+
+# Phase error status buckets (integer ms), looked up with one bisect:
+# < -50 OVERLAP | -50..-11 WARNING | -10..+10 GOOD | +11..+50 WARNING | > +50 DRIFT
+PHASE_ERROR_BOUNDS = (-51, -11, 10, 50)
+PHASE_ERROR_STATUSES = ("OVERLAP", "WARNING", "GOOD", "WARNING", "DRIFT")
+
+def iter_marker_lines(buf, markers):
+    """Yield each line of buf that contains any of the markers, in file order.
+
+    Jumps from hit to hit with bytes.find (a C-level scan over the whole buffer)
+    instead of visiting every line in Python, so cost scales with the number
+    of matching lines rather than the size of the log.
+    """
+    next_hits = [buf.find(marker) for marker in markers]
+
+    while True:
+        live_hits = [pos for pos in next_hits if pos >= 0]
+        if not live_hits:
+            return
+
+        pos = min(live_hits)
+        line_start = buf.rfind(b'\n', 0, pos) + 1
+        line_end = buf.find(b'\n', pos)
+        if line_end < 0:
+            line_end = len(buf)
+
+        yield buf[line_start:line_end]
 
-def parse_log_active_only(filename):
+        # Re-scan any marker whose next hit fell inside the line just yielded
+        for i, marker in enumerate(markers):
+            if 0 <= next_hits[i] < line_end:
+                next_hits[i] = buf.find(marker, line_end)
+
+def parse_log_active_only(filename, encoding=None):
     """Extract ACTIVE activation timestamps and cycle period from log file.
 
     IMPORTANT: Only counts "Cycle starts ACTIVE" - ignores INACTIVE transitions.
+
+    Pass encoding (e.g. 'utf-8' or 'utf-16-le') to skip UTF-16 BOM detection
+    when the log format is already known. Only UTF-8/ASCII and UTF-16 LE logs
+    are supported; any other encoding raises ValueError.
     """
     activations = []
     current_cycle_ms = None
 
-    # Detect encoding by checking for UTF-16 LE BOM (FF FE)
+    # Read raw bytes once
     with open(filename, 'rb') as f:
-        first_bytes = f.read(2)
-
-    if first_bytes == b'\xff\xfe':
-        encoding = 'utf-16-le'
-    else:
-        encoding = 'utf-8'
-
-    # Read file with detected encoding
-    with open(filename, 'r', encoding=encoding, errors='ignore') as f:
-        lines = f.readlines()
-
-    for line in lines:
-        # Remove ALL spaces (handles both normal and wide-character encoding)
-        cleaned_line = line.replace(' ', '')
-
+        raw = f.read()
+
+    # Unless the caller already knows the format, detect encoding by
+    # checking for UTF-16 LE BOM (FF FE)
+    if encoding is None:
+        encoding = 'utf-16-le' if raw[:2] == b'\xff\xfe' else 'utf-8'
+    codec = codecs.lookup(encoding).name
+
+    # Every marker is pure ASCII, so scan the bytes without decoding.
+    # In UTF-16 LE the ASCII byte of each code unit sits at the even offsets.
+    if codec in UTF16_LE_CODECS and raw[:2] != b'\xfe\xff':
+        raw = raw[::2]
+    elif codec not in ASCII_COMPATIBLE_CODECS:
+        raise ValueError(f"Unsupported log encoding {encoding!r} "
+                         "(expected UTF-8/ASCII or UTF-16 LE)")
+
+    # Normalize CRLF / bare CR line endings, then remove ALL spaces in one pass
+    # (handles both normal and wide-character encoding)
+    cleaned = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n').replace(b' ', b'')
+
+    # Only visit lines carrying an epoch or ACTIVE marker
+    for cleaned_line in iter_marker_lines(cleaned, (b'Motorepochset', b'CyclestartsACTIVE')):
         # Extract cycle period from motor epoch
         # Format: "Motor epoch set: 6072947 us, cycle: 2000 ms"
-        epoch_match = re.search(r'Motorepochset:(\d+)us,cycle:(\d+)ms', cleaned_line)
-        if epoch_match:
-            current_cycle_ms = int(epoch_match.group(2))
+        if b'Motorepochset' in cleaned_line:
+            epoch_match = EPOCH_PATTERN.search(cleaned_line)
+            if epoch_match:
+                current_cycle_ms = int(epoch_match.group(2))
 
         # Extract ACTIVE activation timestamp ONLY
         # Matches "Cycle starts ACTIVE" but NOT "Cycle starts INACTIVE"
-        active_match = re.search(r'I\((\d+)\)MOTOR_TASK:.*CyclestartsACTIVE', cleaned_line)
-
-        if active_match:
-            timestamp_ms = int(active_match.group(1))
-            if current_cycle_ms:  # Only add if we have a valid cycle period
-                activations.append((timestamp_ms, current_cycle_ms))
+        if b'CyclestartsACTIVE' in cleaned_line:
+            active_match = ACTIVE_PATTERN.search(cleaned_line)
+            if active_match:
+                timestamp_ms = int(active_match.group(1))
+                if current_cycle_ms:  # Only add if we have a valid cycle period
+                    activations.append((timestamp_ms, current_cycle_ms))
 
     return activations
 
+def pair_activations(server_acts, client_acts):
+    """Pair SERVER and CLIENT ACTIVE activations chronologically.
+
+    Tight two-pointer walk that only does integer arithmetic; classification
+    and printing happen afterwards over the collected pairs.
+
+    Returns:
+        List of (server_ts, server_period, client_ts, phase_error_ms) tuples
+    """
+    pairs = []
+    server_idx = 0
+    client_idx = 0
+    server_count = len(server_acts)
+    client_count = len(client_acts)
+
+    while server_idx < server_count and client_idx < client_count:
+        server_ts, server_period = server_acts[server_idx]
+        client_ts = client_acts[client_idx][0]
+        half_period = server_period // 2
+
+        # Target antiphase: CLIENT should start ACTIVE at SERVER_time + period/2
+        # Phase error: How far is CLIENT from ideal target?
+        phase_error_ms = client_ts - (server_ts + half_period)
+        pairs.append((server_ts, server_period, client_ts, phase_error_ms))
+
+        # Move to next pair
+        if phase_error_ms < -half_period:
+            # CLIENT is more than half-period before SERVER - likely from previous cycle
+            client_idx += 1
+        elif phase_error_ms > half_period:
+            # CLIENT is more than half-period after SERVER - likely from next cycle
+            server_idx += 1
+        else:
+            # Normal case - within reasonable range, advance both
+            server_idx += 1
+            client_idx += 1
+
+    return pairs
+
+def classify_phase_error(phase_error_ms):
+    """Return status label (GOOD/WARNING/OVERLAP/DRIFT) for a phase error."""
+    return PHASE_ERROR_STATUSES[bisect_left(PHASE_ERROR_BOUNDS, phase_error_ms)]
+
 def main():
     if len(sys.argv) != 3:
         print("Usage: analyze_bilateral_phase.py <server_log> <client_log>")
@@ -75,67 +175,33 @@ def main():
         print("ERROR: No activations found in one or both logs")
         sys.exit(1)
 
-    # Statistics tracking
-    all_phase_errors = []
-    overlap_count = 0
-    good_count = 0
-    warning_count = 0
-    drift_count = 0
+    # Pair up activations - match each CLIENT ACTIVE with nearest SERVER ACTIVE
+    pairs = pair_activations(server_acts, client_acts)
+
+    # Statistics over the whole run
+    all_phase_errors = [pair[3] for pair in pairs]
+    statuses = [classify_phase_error(err) for err in all_phase_errors]
+    status_counts = Counter(statuses)
+    good_count = status_counts["GOOD"]
+    warning_count = status_counts["WARNING"]
+    overlap_count = status_counts["OVERLAP"]
+    drift_count = status_counts["DRIFT"]
 
     print("\n" + "="*100)
     print("BILATERAL PHASE TIMING ANALYSIS (ACTIVE CYCLES ONLY)")
     print("="*100)
 
-    # Pair up activations - match each CLIENT ACTIVE with nearest SERVER ACTIVE
     print(f"\n{'Time (s)':<12} {'Period (ms)':<12} {'CLIENT @':<12} {'Target @':<12} {'Phase Err':<12} {'Status'}")
     print("-" * 100)
 
-    server_idx = 0
-    client_idx = 0
-
-    while server_idx < len(server_acts) and client_idx < len(client_acts):
-        server_ts, server_period = server_acts[server_idx]
-        client_ts, client_period = client_acts[client_idx]
-
-        # Target antiphase: CLIENT should start ACTIVE at SERVER_time + period/2
-        target_client_ts = server_ts + (server_period // 2)
-
-        # Phase error: How far is CLIENT from ideal target?
-        phase_error_ms = client_ts - target_client_ts
-
-        # Status
-        if abs(phase_error_ms) <= 10:
-            status = "GOOD"
-            good_count += 1
-        elif abs(phase_error_ms) <= 50:
-            status = "WARNING"
-            warning_count += 1
-        elif phase_error_ms < 0:
-            status = "OVERLAP"
-            overlap_count += 1
-        else:
-            status = "DRIFT"
-            drift_count += 1
-
-        all_phase_errors.append(phase_error_ms)
-
-        # Print analysis
+    # Format all rows first and emit them with a single write
+    rows = []
+    for (server_ts, server_period, client_ts, phase_error_ms), status in zip(pairs, statuses):
         time_s = server_ts / 1000.0
         client_rel_ms = client_ts - server_ts  # Relative to SERVER start
         target_rel_ms = server_period // 2
-        print(f"{time_s:<12.2f} {server_period:<12} {client_rel_ms:<+12} {target_rel_ms:<12} {phase_error_ms:<+12} {status}")
-
-        # Move to next pair
-        if phase_error_ms < -(server_period // 2):
-            # CLIENT is more than half-period before SERVER - likely from previous cycle
-            client_idx += 1
-        elif phase_error_ms > (server_period // 2):
-            # CLIENT is more than half-period after SERVER - likely from next cycle
-            server_idx += 1
-        else:
-            # Normal case - within reasonable range, advance both
-            server_idx += 1
-            client_idx += 1
+        rows.append(f"{time_s:<12.2f} {server_period:<12} {client_rel_ms:<+12} {target_rel_ms:<12} {phase_error_ms:<+12} {status}")
+    sys.stdout.write('\n'.join(rows) + '\n')
 
     print("="*100)
 
@@ -11,112 +11,203 @@ Enhanced version that extracts:
 Correlates phase errors with BLE link quality to identify root causes.
 """
 
+import codecs
 import re
 import sys
 import statistics
-from collections import defaultdict
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+
+# Regex patterns (applied to raw ASCII bytes with all spaces removed)
+TIMESTAMP_PATTERN = re.compile(rb'I\((\d+)\)')
+EPOCH_PATTERN = re.compile(rb'Motorepochset:(\d+)us,cycle:(\d+)ms')
+ACTIVE_PATTERN = re.compile(rb'MOTOR_TASK:.*CyclestartsACTIVE')
+# RSSI, RTT (case-insensitive) and quality as one alternation; the named
+# group that matched identifies the metric
+METRIC_PATTERN = re.compile(
+    rb'rssi[=:]\s*(?P<rssi>-?\d+)'
+    rb'|(?i:RTTmeasured:|rtt[=:])\s*(?P<rtt>\d+)'
+    rb'|quality[=:]\s*(?P<quality>\d+)%?'
+)
+
+# Encodings the byte-level scan understands (names as normalized by codecs.lookup):
+# ASCII-compatible logs are scanned as-is, UTF-16 LE logs via their low bytes
+# (generic 'utf-16' is accepted unless the file has a big-endian BOM)
+ASCII_COMPATIBLE_CODECS = ('utf-8', 'utf-8-sig', 'ascii')
+UTF16_LE_CODECS = ('utf-16-le', 'utf-16')
+
+# Phase error status buckets (integer ms), looked up with one bisect:
+# < -50 OVERLAP | -50..-11 WARNING | -10..+10 GOOD | +11..+50 WARNING | > +50 DRIFT
+PHASE_ERROR_BOUNDS = (-51, -11, 10, 50)
+PHASE_ERROR_STATUSES = ("OVERLAP", "WARNING", "GOOD", "WARNING", "DRIFT")
+
+# Substrings that identify lines worth parsing, as one alternation (rtt in any
+# case, matching the RTT branch of METRIC_PATTERN)
+LINE_MARKER_PATTERN = re.compile(rb'MOTOR_TASK|Motorepochset|rssi|(?i:rtt)|quality')
+
+def iter_marker_lines(buf, marker_pattern):
+    """Yield each line of buf that contains a marker_pattern match, in file order.
+
+    A single compiled alternation walks the buffer from hit to hit, so lines
+    without any marker are never visited in Python and the timestamp regex
+    only runs on lines that can carry data.
+    """
+    pos = 0
+
+    while True:
+        hit = marker_pattern.search(buf, pos)
+        if hit is None:
+            return
+
+        line_start = buf.rfind(b'\n', 0, hit.start()) + 1
+        line_end = buf.find(b'\n', hit.end())
+        if line_end < 0:
+            line_end = len(buf)
 
-def parse_log_with_metrics(filename):
+        yield buf[line_start:line_end]
+        pos = line_end
+
+def parse_log_with_metrics(filename, encoding=None):
     """Extract ACTIVE activation timestamps and BLE metrics from log file.
 
+    Pass encoding (e.g. 'utf-8' or 'utf-16-le') to skip UTF-16 BOM detection
+    when the log format is already known. Only UTF-8/ASCII and UTF-16 LE logs
+    are supported; any other encoding raises ValueError.
+
     Returns:
         activations: List of (timestamp_ms, cycle_ms) tuples for ACTIVE states
-        rssi_by_time: Dict mapping timestamp -> RSSI value
-        rtt_by_time: Dict mapping timestamp -> RTT value
-        quality_by_time: Dict mapping timestamp -> quality percentage
+        rssi: (timestamps, values) parallel arrays of RSSI samples (dBm)
+        rtt: (timestamps, values) parallel arrays of RTT samples (ms)
+        quality: (timestamps, values) parallel arrays of quality percentages
+
+    Each metric series is sorted by timestamp (see build_metric_index), so
+    the arrays can be passed straight to find_last_known_metric().
     """
     activations = []
-    rssi_by_time = {}
-    rtt_by_time = {}
-    quality_by_time = {}
+    rssi_ts, rssi_vals = array('q'), array('i')
+    rtt_ts, rtt_vals = array('q'), array('d')
+    quality_ts, quality_vals = array('q'), array('i')
     current_cycle_ms = None
 
-    # Detect encoding by checking for UTF-16 LE BOM (FF FE)
+    # Read raw bytes once
     with open(filename, 'rb') as f:
-        first_bytes = f.read(2)
-
-    if first_bytes == b'\xff\xfe':
-        encoding = 'utf-16-le'
-    else:
-        encoding = 'utf-8'
-
-    # Read file with detected encoding
-    with open(filename, 'r', encoding=encoding, errors='ignore') as f:
-        lines = f.readlines()
-
-    for line in lines:
-        # Remove ALL spaces (handles both normal and wide-character encoding)
-        cleaned_line = line.replace(' ', '')
-
+        raw = f.read()
+
+    # Unless the caller already knows the format, detect encoding by
+    # checking for UTF-16 LE BOM (FF FE)
+    if encoding is None:
+        encoding = 'utf-16-le' if raw[:2] == b'\xff\xfe' else 'utf-8'
+    codec = codecs.lookup(encoding).name
+
+    # Every marker is pure ASCII, so scan the bytes without decoding.
+    # In UTF-16 LE the ASCII byte of each code unit sits at the even offsets.
+    if codec in UTF16_LE_CODECS and raw[:2] != b'\xfe\xff':
+        raw = raw[::2]
+    elif codec not in ASCII_COMPATIBLE_CODECS:
+        raise ValueError(f"Unsupported log encoding {encoding!r} "
+                         "(expected UTF-8/ASCII or UTF-16 LE)")
+
+    # Normalize CRLF / bare CR line endings, then remove ALL spaces in one pass
+    # (handles both normal and wide-character encoding)
+    cleaned = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n').replace(b' ', b'')
+
+    # Stream only lines carrying motor or BLE metric data - most lines have neither
+    for cleaned_line in iter_marker_lines(cleaned, LINE_MARKER_PATTERN):
         # Extract timestamp from log line (I(timestamp))
-        ts_match = re.search(r'I\((\d+)\)', cleaned_line)
+        ts_match = TIMESTAMP_PATTERN.search(cleaned_line)
         if not ts_match:
             continue
         timestamp_ms = int(ts_match.group(1))
 
         # Extract cycle period from motor epoch
         # Format: "Motor epoch set: 6072947 us, cycle: 2000 ms"
-        epoch_match = re.search(r'Motorepochset:(\d+)us,cycle:(\d+)ms', cleaned_line)
-        if epoch_match:
-            current_cycle_ms = int(epoch_match.group(2))
+        if b'Motorepochset' in cleaned_line:
+            epoch_match = EPOCH_PATTERN.search(cleaned_line)
+            if epoch_match:
+                current_cycle_ms = int(epoch_match.group(2))
 
         # Extract ACTIVE activation timestamp ONLY
         # Matches "Cycle starts ACTIVE" but NOT "Cycle starts INACTIVE"
-        active_match = re.search(r'MOTOR_TASK:.*CyclestartsACTIVE', cleaned_line)
-        if active_match and current_cycle_ms:
-            activations.append((timestamp_ms, current_cycle_ms))
-
-        # Extract RSSI from beacon processing
-        # Format: "Beacon processed (seq: X, rssi: -YY dBm, ...)"
-        # Or: "rssi=-XX" or "RSSI:-XX"
-        rssi_match = re.search(r'rssi[=:]\s*(-?\d+)', cleaned_line)
-        if rssi_match:
-            rssi_dbm = int(rssi_match.group(1))
-            rssi_by_time[timestamp_ms] = rssi_dbm
-
-        # Extract RTT from beacon processing
-        # Format: "RTT measured: XXXXX μs" (in microseconds, need to convert to ms)
-        # After space removal: "RTTmeasured:81452μs" or "rtt=XXms"
-        rtt_match = re.search(r'(RTTmeasured:|rtt[=:])\s*(\d+)', cleaned_line, re.IGNORECASE)
-        if rtt_match:
-            rtt_value = int(rtt_match.group(2))
-            # Check if it's in microseconds (typically >1000)
-            if rtt_value > 1000:
-                rtt_ms = rtt_value / 1000.0  # Convert μs to ms
+        if b'CyclestartsACTIVE' in cleaned_line:
+            active_match = ACTIVE_PATTERN.search(cleaned_line)
+            if active_match and current_cycle_ms:
+                activations.append((timestamp_ms, current_cycle_ms))
+
+        # Extract RSSI, RTT and quality from beacon processing in one regex sweep
+        # RSSI format: "Beacon processed (seq: X, rssi: -YY dBm, ...)" or "rssi=-XX"
+        # RTT format: "RTT measured: XXXXX μs" (in microseconds, need to convert to ms)
+        #   After space removal: "RTTmeasured:81452μs" or "rtt=XXms"
+        # Quality format: "quality=XX%" or "Quality: XX%"
+        seen_metrics = set()
+        for metric_match in METRIC_PATTERN.finditer(cleaned_line):
+            metric = metric_match.lastgroup
+            if metric in seen_metrics:
+                continue  # Only the first sample of each kind per line counts
+            seen_metrics.add(metric)
+            value = int(metric_match.group(metric))
+
+            if metric == 'rssi':
+                record_metric(rssi_ts, rssi_vals, timestamp_ms, value)
+            elif metric == 'rtt':
+                # Check if it's in microseconds (typically >1000)
+                if value > 1000:
+                    rtt_ms = value / 1000.0  # Convert μs to ms
+                else:
+                    rtt_ms = float(value)  # Already in ms
+                record_metric(rtt_ts, rtt_vals, timestamp_ms, rtt_ms)
             else:
-                rtt_ms = float(rtt_value)  # Already in ms
-            rtt_by_time[timestamp_ms] = rtt_ms
+                record_metric(quality_ts, quality_vals, timestamp_ms, value)
 
-        # Extract quality from beacon processing or quality updates
-        # Format: "quality=XX%" or "Quality: XX%"
-        quality_match = re.search(r'quality[=:]\s*(\d+)%?', cleaned_line)
-        if quality_match:
-            quality_pct = int(quality_match.group(1))
-            quality_by_time[timestamp_ms] = quality_pct
+    return (activations,
+            build_metric_index(rssi_ts, rssi_vals),
+            build_metric_index(rtt_ts, rtt_vals),
+            build_metric_index(quality_ts, quality_vals))
 
-    return activations, rssi_by_time, rtt_by_time, quality_by_time
+def record_metric(timestamps, values, timestamp_ms, value):
+    """Append a metric sample, replacing the previous one if logged in the same ms."""
+    if timestamps and timestamps[-1] == timestamp_ms:
+        values[-1] = value
+    else:
+        timestamps.append(timestamp_ms)
+        values.append(value)
+
+def build_metric_index(timestamps, values):
+    """Sort a metric series by timestamp, keeping the last sample logged per ms.
+
+    Device ticks restart from zero after a reboot, so log order is not always
+    time order. A series that already ascends (the common case) is returned
+    as is; otherwise it is rebuilt once here rather than on every lookup.
+
+    Returns:
+        (timestamps, values) with timestamps in ascending order
+    """
+    if array(timestamps.typecode, sorted(timestamps)) == timestamps:
+        return timestamps, values
 
-def find_last_known_metric(timestamp_ms, metric_by_time):
+    by_time = dict(zip(timestamps, values))  # Later samples overwrite earlier ones
+    sorted_ts = array(timestamps.typecode, sorted(by_time))
+    return sorted_ts, array(values.typecode, [by_time[ts] for ts in sorted_ts])
+
+def find_last_known_metric(timestamp_ms, metric_timestamps, metric_values):
     """Find last known metric value at or before timestamp.
 
     Uses "carry forward" approach - returns the most recent metric
     measurement that occurred before or at the given timestamp.
     This ensures all motor activations have link quality data.
 
+    Expects the sorted parallel arrays from build_metric_index(), so each
+    lookup is a binary search rather than a sort of every metric sample.
+
     Returns metric value or None if no metric exists before timestamp.
     """
-    if not metric_by_time:
-        return None
-
-    # Find the most recent metric timestamp that is <= current timestamp
-    last_metric_ts = None
-    for ts in sorted(metric_by_time.keys()):
-        if ts <= timestamp_ms:
-            last_metric_ts = ts
-        else:
-            break  # Stop once we pass the target timestamp
+    # Index of the most recent metric timestamp that is <= current timestamp
+    idx = bisect_right(metric_timestamps, timestamp_ms) - 1
+    return metric_values[idx] if idx >= 0 else None
 
-    return metric_by_time.get(last_metric_ts) if last_metric_ts is not None else None
+def classify_phase_error(phase_error_ms):
+    """Return status label (GOOD/WARNING/OVERLAP/DRIFT) for a phase error."""
+    return PHASE_ERROR_STATUSES[bisect_left(PHASE_ERROR_BOUNDS, phase_error_ms)]
 
 def main():
     if len(sys.argv) != 3:
@@ -131,16 +222,16 @@ def main():
     print(f"  Found {len(server_acts)} SERVER activations")
 
     print("Parsing CLIENT log (ACTIVE + BLE metrics)...")
-    client_acts, rssi_by_time, rtt_by_time, quality_by_time = parse_log_with_metrics(client_log)
+    client_acts, (rssi_ts, rssi_vals), (rtt_ts, rtt_vals), (quality_ts, quality_vals) = parse_log_with_metrics(client_log)
     print(f"  Found {len(client_acts)} CLIENT activations")
-    print(f"  Found {len(rssi_by_time)} RSSI samples")
-    print(f"  Found {len(rtt_by_time)} RTT samples")
-    print(f"  Found {len(quality_by_time)} Quality samples")
+    print(f"  Found {len(rssi_ts)} RSSI samples")
+    print(f"  Found {len(rtt_ts)} RTT samples")
+    print(f"  Found {len(quality_ts)} Quality samples")
 
     # Debug: Show first few RTT samples
-    if rtt_by_time:
+    if rtt_ts:
         print(f"\n  First 5 RTT samples:")
-        for i, (ts, rtt) in enumerate(sorted(rtt_by_time.items())[:5]):
+        for ts, rtt in zip(rtt_ts[:5], rtt_vals[:5]):
             print(f"    T={ts}ms: RTT={rtt:.1f}ms")
     else:
         print(f"\n  WARNING: No RTT samples found in CLIENT log!")
@@ -152,10 +243,7 @@ def main():
     # Statistics tracking
     all_phase_errors = []
     phase_with_metrics = []  # Tuples of (phase_error, rssi, rtt, quality)
-    overlap_count = 0
-    good_count = 0
-    warning_count = 0
-    drift_count = 0
+    statuses = []
 
     print("\n" + "="*120)
     print("BILATERAL PHASE TIMING WITH BLE LINK QUALITY ANALYSIS")
@@ -165,6 +253,8 @@ def main():
     print(f"\n{'Time (s)':<10} {'Period':<8} {'CLIENT @':<10} {'Target @':<10} {'Phase Err':<11} {'RSSI':<8} {'RTT':<8} {'Quality':<9} {'Status'}")
     print("-" * 120)
 
+    # Table rows are collected and emitted with a single write after the loop
+    rows = []
     server_idx = 0
     client_idx = 0
 
@@ -179,31 +269,21 @@ def main():
         phase_error_ms = client_ts - target_client_ts
 
         # Find last known BLE metrics (carry forward until next beacon update)
-        rssi = find_last_known_metric(client_ts, rssi_by_time)
-        rtt = find_last_known_metric(client_ts, rtt_by_time)
-        quality = find_last_known_metric(client_ts, quality_by_time)
+        rssi = find_last_known_metric(client_ts, rssi_ts, rssi_vals)
+        rtt = find_last_known_metric(client_ts, rtt_ts, rtt_vals)
+        quality = find_last_known_metric(client_ts, quality_ts, quality_vals)
 
         # Track metrics correlation
         if rssi is not None or rtt is not None or quality is not None:
             phase_with_metrics.append((phase_error_ms, rssi, rtt, quality))
 
         # Status
-        if abs(phase_error_ms) <= 10:
-            status = "GOOD"
-            good_count += 1
-        elif abs(phase_error_ms) <= 50:
-            status = "WARNING"
-            warning_count += 1
-        elif phase_error_ms < 0:
-            status = "OVERLAP"
-            overlap_count += 1
-        else:
-            status = "DRIFT"
-            drift_count += 1
+        status = classify_phase_error(phase_error_ms)
+        statuses.append(status)
 
         all_phase_errors.append(phase_error_ms)
 
-        # Print analysis
+        # Format analysis row
         time_s = server_ts / 1000.0
         client_rel_ms = client_ts - server_ts  # Relative to SERVER start
         target_rel_ms = server_period // 2
@@ -212,7 +292,7 @@ def main():
         rtt_str = f"{rtt:.1f} ms" if rtt is not None else "N/A"
         quality_str = f"{quality}%" if quality is not None else "N/A"
 
-        print(f"{time_s:<10.2f} {server_period:<8} {client_rel_ms:<+10} {target_rel_ms:<10} {phase_error_ms:<+11} {rssi_str:<8} {rtt_str:<8} {quality_str:<9} {status}")
+        rows.append(f"{time_s:<10.2f} {server_period:<8} {client_rel_ms:<+10} {target_rel_ms:<10} {phase_error_ms:<+11} {rssi_str:<8} {rtt_str:<8} {quality_str:<9} {status}")
 
         # Move to next pair
         if phase_error_ms < -(server_period // 2):
@@ -226,8 +306,16 @@ def main():
             server_idx += 1
             client_idx += 1
 
+    sys.stdout.write('\n'.join(rows) + '\n')
     print("="*120)
 
+    # Count all statuses in one pass
+    status_counts = Counter(statuses)
+    good_count = status_counts["GOOD"]
+    warning_count = status_counts["WARNING"]
+    overlap_count = status_counts["OVERLAP"]
+    drift_count = status_counts["DRIFT"]
+
     # Statistics summary
     print("\n" + "="*120)
     print("PHASE ERROR STATISTICS")
@@ -5,48 +5,179 @@ Calculates CLIENT activation delta from SERVER's period/2 target.
 FIX: Deduplicates activations by timestamp (don't count "Cycle starts" AND "Motor cmd" separately)
 """
 
+import io
 import re
 import sys
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+
+# Regex patterns (spacing between tokens is tolerated with \s*)
+EPOCH_PATTERN = re.compile(r'Motor epoch set:\s*(\d+)\s*us,\s*cycle:\s*(\d+)\s*ms')
+ACTIVE_PATTERN = re.compile(r'I\s*\((\d+)\)\s*MOTOR_TASK:.*Cycle starts ACTIVE')
+
+# Same patterns for undecoded UTF-8 logs (markers and digits are ASCII)
+EPOCH_BYTES_PATTERN = re.compile(EPOCH_PATTERN.pattern.encode())
+ACTIVE_BYTES_PATTERN = re.compile(ACTIVE_PATTERN.pattern.encode())
+
+# Logs are scanned in blocks of whole lines of roughly this size (bytes, or
+# characters for decoded UTF-16 logs)
+BLOCK_SIZE = 1 << 20
+
+# Timing error status buckets (integer ms), looked up with one bisect:
+# < -50 OVERLAP | -50..-11 WARNING | -10..+10 GOOD | +11..+50 WARNING | > +50 DRIFT
+ERROR_BOUNDS = (-51, -11, 10, 50)
+ERROR_STATUSES = ("OVERLAP", "WARNING", "GOOD", "WARNING", "DRIFT")
+
+def iter_log_blocks(filename):
+    """Yield the log in blocks of whole lines.
+
+    UTF-8 logs are yielded as undecoded bytes; UTF-16 LE logs (BOM FF FE)
+    are decoded incrementally and yielded as str, so both formats stream.
+    CRLF and bare CR line endings are translated to LF in either case.
+    """
+    with open(filename, 'rb') as f:
+        # Detect encoding by checking for UTF-16 LE BOM (FF FE)
+        if f.read(2) == b'\xff\xfe':
+            # Universal newlines: the text layer translates CR / CRLF itself
+            lines_source = io.TextIOWrapper(f, encoding='utf-16-le', errors='ignore')
+            while True:
+                # Read a block and finish its last line so no line is split
+                block = lines_source.read(BLOCK_SIZE)
+                if not block:
+                    return
+                block += lines_source.readline()
+                yield block
+
+        f.seek(0)
+        # Binary readline() only stops at LF, so cut each block after its last
+        # CR or LF and carry the partial line over to the next block
+        pending = b''
+        while True:
+            chunk = f.read(BLOCK_SIZE)
+            if not chunk:
+                if pending:
+                    yield pending.replace(b'\r', b'\n')
+                return
+            block = pending + chunk
+            cut = max(block.rfind(b'\n'), block.rfind(b'\r')) + 1
+            pending = block[cut:]
+            if cut:
+                yield block[:cut].replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+
+def iter_marker_lines(buf, markers):
+    """Yield each line of buf that contains any of the markers, in file order.
+
+    Jumps from hit to hit with find (a C-level scan over the whole buffer)
+    instead of visiting every line in Python, so cost scales with the number
+    of matching lines rather than the size of the log. buf and markers may
+    be bytes or str.
+    """
+    newline = b'\n' if isinstance(buf, bytes) else '\n'
+    next_hits = [buf.find(marker) for marker in markers]
+
+    while True:
+        live_hits = [pos for pos in next_hits if pos >= 0]
+        if not live_hits:
+            return
+
+        pos = min(live_hits)
+        line_start = buf.rfind(newline, 0, pos) + 1
+        line_end = buf.find(newline, pos)
+        if line_end < 0:
+            line_end = len(buf)
+
+        yield buf[line_start:line_end]
+
+        # Re-scan any marker whose next hit fell inside the line just yielded
+        for i, marker in enumerate(markers):
+            if 0 <= next_hits[i] < line_end:
+                next_hits[i] = buf.find(marker, line_end)
 
 def parse_log(filename):
     """Extract activation timestamps and cycle period from log file."""
-    activations_set = set()  # Use set to deduplicate by (timestamp, cycle)
+    # Parallel compact buffers of machine integers instead of a list of tuples
+    ts_buf = array('q')
+    cy_buf = array('q')
     current_cycle_ms = None
 
-    # Detect encoding by checking for UTF-16 LE BOM (FF FE)
-    with open(filename, 'rb') as f:
-        first_bytes = f.read(2)
-
-    if first_bytes == b'\xff\xfe':
-        encoding = 'utf-16-le'
-    else:
-        encoding = 'utf-8'
-
-    # Read file with detected encoding
-    with open(filename, 'r', encoding=encoding, errors='ignore') as f:
-        lines = f.readlines()
-
-    for line in lines:
-            # Remove ALL spaces (handles both normal and wide-character encoding)
-            cleaned_line = line.replace(' ', '')
+    for block in iter_log_blocks(filename):
+        if isinstance(block, bytes):
+            epoch_marker, active_marker = b'Motor epoch set', b'Cycle starts ACTIVE'
+            epoch_pattern, active_pattern = EPOCH_BYTES_PATTERN, ACTIVE_BYTES_PATTERN
+        else:
+            epoch_marker, active_marker = 'Motor epoch set', 'Cycle starts ACTIVE'
+            epoch_pattern, active_pattern = EPOCH_PATTERN, ACTIVE_PATTERN
 
+        # Only visit lines carrying an epoch or ACTIVE marker
+        for line in iter_marker_lines(block, (epoch_marker, active_marker)):
             # Extract cycle period from motor epoch
             # Format: "Motor epoch set: 6072947 us, cycle: 2000 ms"
-            epoch_match = re.search(r'Motorepochset:(\d+)us,cycle:(\d+)ms', cleaned_line)
-            if epoch_match:
-                current_cycle_ms = int(epoch_match.group(2))
+            if epoch_marker in line:
+                epoch_match = epoch_pattern.search(line)
+                if epoch_match:
+                    current_cycle_ms = int(epoch_match.group(2))
 
             # Extract activation timestamp - ONLY from "Cycle starts ACTIVE" (more reliable)
-            active_match = re.search(r'I\((\d+)\)MOTOR_TASK:.*CyclestartsACTIVE', cleaned_line)
+            if active_marker in line:
+                active_match = active_pattern.search(line)
+                if active_match:
+                    timestamp_ms = int(active_match.group(1))
+                    if current_cycle_ms:  # Only add if we have a valid cycle period
+                        ts_buf.append(timestamp_ms)
+                        cy_buf.append(current_cycle_ms)
+
+    # Sort once and deduplicate (repeats are adjacent after sorting)
+    activations = [key for key, _ in groupby(sorted(zip(ts_buf, cy_buf)))]
+    return activations
 
-            if active_match:
-                timestamp_ms = int(active_match.group(1))
-                if current_cycle_ms:  # Only add if we have a valid cycle period
-                    activations_set.add((timestamp_ms, current_cycle_ms))
+def pair_activations(server_acts, client_acts):
+    """Pair SERVER and CLIENT activations chronologically.
 
-    # Convert set to sorted list
-    activations = sorted(list(activations_set))
-    return activations
+    Tight walk over both sorted lists that only does integer arithmetic;
+    classification and printing happen afterwards over the collected pairs.
+
+    Returns:
+        List of (server_ts, server_period, delta_ms, target_ms, error_ms) tuples
+    """
+    pairs = []
+    server_idx = 0
+    client_idx = 0
+    server_count = len(server_acts)
+    client_count = len(client_acts)
+
+    while server_idx < server_count and client_idx < client_count:
+        server_ts, server_period = server_acts[server_idx]
+        client_ts = client_acts[client_idx][0]
+
+        # Calculate delta (CLIENT - SERVER)
+        delta_ms = client_ts - server_ts
+
+        # Target is period/2
+        target_ms = server_period // 2 if server_period else 1000
+
+        # Error from target
+        error_ms = delta_ms - target_ms
+        pairs.append((server_ts, server_period, delta_ms, target_ms, error_ms))
+
+        # Move to next pair
+        if delta_ms < 0:
+            # CLIENT activated before this SERVER - skip this CLIENT
+            client_idx += 1
+        else:
+            # Normal case - move to next SERVER
+            server_idx += 1
+            # Also move CLIENT if we've processed this one
+            if client_idx < client_count - 1:
+                next_client_ts = client_acts[client_idx + 1][0]
+                if next_client_ts < server_ts + server_period:
+                    client_idx += 1
+
+    return pairs
+
+def classify_phase_error(error_ms):
+    """Return status label (GOOD/WARNING/OVERLAP/DRIFT) for a timing error."""
+    return ERROR_STATUSES[bisect_left(ERROR_BOUNDS, error_ms)]
 
 def main():
     if len(sys.argv) != 3:
@@ -73,49 +204,18 @@ def main():
     print("="*80)
 
     # Pair up activations chronologically
-    server_idx = 0
-    client_idx = 0
+    pairs = pair_activations(server_acts, client_acts)
 
     print(f"\n{'Time (s)':<12} {'Period (ms)':<12} {'Delta (ms)':<12} {'Target (ms)':<12} {'Error (ms)':<12} {'Status'}")
     print("-" * 80)
 
-    while server_idx < len(server_acts) and client_idx < len(client_acts):
-        server_ts, server_period = server_acts[server_idx]
-        client_ts, client_period = client_acts[client_idx]
-
-        # Calculate delta (CLIENT - SERVER)
-        delta_ms = client_ts - server_ts
-
-        # Target is period/2
-        target_ms = server_period // 2 if server_period else 1000
-
-        # Error from target
-        error_ms = delta_ms - target_ms
-
-        # Status
-        if abs(error_ms) <= 10:
-            status = "GOOD"
-        elif abs(error_ms) <= 50:
-            status = "WARNING"
-        else:
-            status = "OVERLAP" if error_ms < 0 else "DRIFT"
-
-        # Print analysis
+    # Format all rows first and emit them with a single write
+    rows = []
+    for server_ts, server_period, delta_ms, target_ms, error_ms in pairs:
+        status = classify_phase_error(error_ms)
         time_s = server_ts / 1000.0
-        print(f"{time_s:<12.2f} {server_period:<12} {delta_ms:<12} {target_ms:<12} {error_ms:<+12} {status}")
-
-        # Move to next pair
-        if delta_ms < 0:
-            # CLIENT activated before this SERVER - skip this CLIENT
-            client_idx += 1
-        else:
-            # Normal case - move to next SERVER
-            server_idx += 1
-            # Also move CLIENT if we've processed this one
-            if client_idx < len(client_acts) - 1:
-                next_client_ts = client_acts[client_idx + 1][0]
-                if next_client_ts < server_ts + server_period:
-                    client_idx += 1
+        rows.append(f"{time_s:<12.2f} {server_period:<12} {delta_ms:<12} {target_ms:<12} {error_ms:<+12} {status}")
+    sys.stdout.write('\n'.join(rows) + '\n')
 
     print("="*80)
 
@@ -19,98 +19,122 @@ Date: 2025-11-29
 
 import sys
 import re
+from functools import lru_cache
 from pathlib import Path
-from collections import OrderedDict
+from itertools import chain, islice
 
 
 # Compression dictionary (order matters - longest matches first)
-COMPRESSION_DICT = OrderedDict([
+COMPRESSION_DICT = {
     # Task names
-    ('MOTOR_TASK', 'MT'),
-    ('BLE_MANAGER', 'BM'),
-    ('BLE_TASK', 'BT'),
-    ('TIME_SYNC_TASK', 'TS'),
-    ('TIME_SYNC', 'TSY'),  # Must come after TIME_SYNC_TASK
-    ('BTN_TASK', 'BTN'),
-    ('BUTTON_TASK', 'BTN'),
-    ('MOTOR_CTRL', 'MC'),
-    ('LED_CTRL', 'LED'),
-    ('STATUS_LED', 'SLED'),
+    'MOTOR_TASK': 'MT',
+    'BLE_MANAGER': 'BM',
+    'BLE_TASK': 'BT',
+    'TIME_SYNC_TASK': 'TS',
+    'TIME_SYNC': 'TSY',  # Must come after TIME_SYNC_TASK
+    'BTN_TASK': 'BTN',
+    'BUTTON_TASK': 'BTN',
+    'MOTOR_CTRL': 'MC',
+    'LED_CTRL': 'LED',
+    'STATUS_LED': 'SLED',
 
     # Roles and states
-    ('CLIENT', 'C'),
-    ('SERVER', 'S'),
-    ('PAIRING', 'PAIR'),
-    ('ADVERTISING', 'ADV'),
-    ('CONNECTED', 'CONN'),
-    ('DISCONNECTED', 'DISC'),
+    'CLIENT': 'C',
+    'SERVER': 'S',
+    'PAIRING': 'PAIR',
+    'ADVERTISING': 'ADV',
+    'CONNECTED': 'CONN',
+    'DISCONNECTED': 'DISC',
 
     # Common operations
-    ('Waiting for', 'Wait'),
-    ('Characteristic', 'Char'),
-    ('notification', 'notif'),
-    ('Notifications', 'Notifs'),
-    ('Connection', 'Conn'),
-    ('connection', 'conn'),
-    ('Discovery', 'Disc'),
-    ('discovery', 'disc'),
-    ('Bilateral', 'Bilat'),
-    ('Configuration', 'Config'),
-    ('coordination', 'coord'),
-    ('Coordination', 'Coord'),
-    ('message', 'msg'),
-    ('Message', 'Msg'),
-    ('received', 'rcv'),
-    ('Received', 'Rcv'),
-    ('Complete', 'OK'),
-    ('complete', 'ok'),
-    ('successful', 'OK'),
-    ('Successfully', 'OK'),
-    ('started', 'start'),
-    ('stopped', 'stop'),
-    ('enabled', 'ON'),
-    ('Enabled', 'ON'),
-    ('disabled', 'OFF'),
-    ('Disabled', 'OFF'),
+    'Waiting for': 'Wait',
+    'Characteristic': 'Char',
+    'notification': 'notif',
+    'Notifications': 'Notifs',
+    'Connection': 'Conn',
+    'connection': 'conn',
+    'Discovery': 'Disc',
+    'discovery': 'disc',
+    'Bilateral': 'Bilat',
+    'Configuration': 'Config',
+    'coordination': 'coord',
+    'Coordination': 'Coord',
+    'message': 'msg',
+    'Message': 'Msg',
+    'received': 'rcv',
+    'Received': 'Rcv',
+    'Complete': 'OK',
+    'complete': 'ok',
+    'successful': 'OK',
+    'Successfully': 'OK',
+    'started': 'start',
+    'stopped': 'stop',
+    'enabled': 'ON',
+    'Enabled': 'ON',
+    'disabled': 'OFF',
+    'Disabled': 'OFF',
 
     # BLE specific
-    ('handle', 'h'),
-    ('Service', 'Svc'),
-    ('service', 'svc'),
+    'handle': 'h',
+    'Service': 'Svc',
+    'service': 'svc',
 
     # Motor specific
-    ('Battery', 'BAT'),
-    ('battery', 'bat'),
-    ('voltage', 'V'),
-    ('Voltage', 'V'),
-    ('Mode change', 'M→'),
-    ('mode change', 'm→'),
-    ('Forward', 'FWD'),
-    ('forward', 'fwd'),
-    ('Reverse', 'REV'),
-    ('reverse', 'rev'),
-    ('coasting', 'coast'),
-    ('Coasting', 'Coast'),
+    'Battery': 'BAT',
+    'battery': 'bat',
+    'voltage': 'V',
+    'Voltage': 'V',
+    'Mode change': 'M→',
+    'mode change': 'm→',
+    'Forward': 'FWD',
+    'forward': 'fwd',
+    'Reverse': 'REV',
+    'reverse': 'rev',
+    'coasting': 'coast',
+    'Coasting': 'Coast',
 
     # Time sync
-    ('beacon', 'bcn'),
-    ('Beacon', 'Bcn'),
-    ('offset', 'off'),
-    ('Offset', 'Off'),
-    ('quality', 'Q'),
-    ('Quality', 'Q'),
-    ('drift', 'drf'),
-    ('Drift', 'Drf'),
+    'beacon': 'bcn',
+    'Beacon': 'Bcn',
+    'offset': 'off',
+    'Offset': 'Off',
+    'quality': 'Q',
+    'Quality': 'Q',
+    'drift': 'drf',
+    'Drift': 'Drf',
 
     # Common symbols
-    ('initialized', 'init'),
-    ('Initialized', 'Init'),
-    ('Initialize', 'Init'),
-    ('Initializing', 'Init'),
-    ('establishing', 'estab'),
-    ('established', 'estab'),
-    ('Established', 'Estab'),
-])
+    'initialized': 'init',
+    'Initialized': 'Init',
+    'Initialize': 'Init',
+    'Initializing': 'Init',
+    'establishing': 'estab',
+    'established': 'estab',
+    'Established': 'Estab',
+}
+
+
+# All COMPRESSION_DICT keys as one alternation (longest first). Multi-word
+# phrases match anywhere; single words need word boundaries to avoid
+# partial matches. The leading lookahead on the keys' first characters
+# lets the regex engine skip positions that cannot start a key.
+_COMPRESSION_KEYS = sorted(COMPRESSION_DICT, key=len, reverse=True)
+_COMPRESSION_FIRST_CHARS = ''.join(sorted({re.escape(k[0]) for k in _COMPRESSION_KEYS}))
+COMPRESSION_PATTERN = re.compile(
+    '(?=[' + _COMPRESSION_FIRST_CHARS + '])(?:' +
+    '|'.join(re.escape(k) for k in _COMPRESSION_KEYS if ' ' in k) +
+    r'|\b(?:' + '|'.join(re.escape(k) for k in _COMPRESSION_KEYS if ' ' not in k) + r')\b)'
+)
+
+# Reverse mapping for decompression (abbreviations shared by several
+# entries resolve to the last one) and its alternation, longest first.
+# Lookarounds instead of \b so abbreviations ending in a symbol (M→) match.
+REVERSE_COMPRESSION_DICT = {v: k for k, v in COMPRESSION_DICT.items()}
+DECOMPRESSION_PATTERN = re.compile(
+    r'(?<!\w)(?:' +
+    '|'.join(re.escape(v) for v in sorted(REVERSE_COMPRESSION_DICT, key=len, reverse=True)) +
+    r')(?!\w)'
+)
 
 
 # Regex patterns for ESP-IDF log lines
@@ -118,16 +142,26 @@ ESP_LOG_PATTERN = re.compile(
     r'^(\d{2}):(\d{2}):(\d{2})\.(\d{3})\s*>.*?([IWED])\s*\((\d+)\)\s*(\w+):\s*(.*)$'
 )
 
+# Compressed line format (for round-trip validation)
+COMPRESSED_LOG_PATTERN = re.compile(
+    r'^(\+?-?\d+(?::\d{2}:\d{2}\.\d{3})?)\s+([IWED])\s+\((\d+)\)\s+(\w+):\s+(.*)$'
+)
+
 # ANSI escape code pattern (for removal)
 ANSI_PATTERN = re.compile(r'\x1b\[[0-9;]*m')
 
+# Translation table that deletes null bytes (UTF-16 artifacts)
+NULL_BYTE_TABLE = str.maketrans('', '', '\x00')
 
-def parse_timestamp(hh, mm, ss, ms):
-    """Convert timestamp components to milliseconds since midnight."""
-    return (int(hh) * 3600000 +
-            int(mm) * 60000 +
-            int(ss) * 1000 +
-            int(ms))
+
+@lru_cache(maxsize=4096)
+def compress_message(message):
+    """
+    Apply COMPRESSION_DICT to a log message.
+
+    Cached because status messages repeat verbatim throughout a log.
+    """
+    return COMPRESSION_PATTERN.sub(lambda m: COMPRESSION_DICT[m.group(0)], message)
 
 
 def compress_line(line, base_timestamp_ms=None):
@@ -137,12 +171,17 @@ def compress_line(line, base_timestamp_ms=None):
     Returns:
         tuple: (compressed_line, timestamp_ms) or (None, None) if not a valid log line
     """
-    # Remove ANSI codes first
-    line = ANSI_PATTERN.sub('', line)
+    # Remove ANSI codes first (only lines with an ESC byte can contain one)
+    if '\x1b' in line:
+        line = ANSI_PATTERN.sub('', line)
 
     # Remove null bytes (UTF-16 artifacts)
     if '\x00' in line:
-        line = line.replace('\x00', '')
+        line = line.translate(NULL_BYTE_TABLE)
+
+    # Cheap shape check for the "HH:MM:SS.mmm >" prefix before running the regex
+    if len(line) < 13 or line[2] != ':' or line[5] != ':' or line[8] != '.':
+        return None, None
 
     # Parse ESP log format
     match = ESP_LOG_PATTERN.match(line)
@@ -151,43 +190,29 @@ def compress_line(line, base_timestamp_ms=None):
 
     hh, mm, ss, ms, level, tick, tag, message = match.groups()
 
-    # Calculate timestamp
-    timestamp_ms = parse_timestamp(hh, mm, ss, ms)
+    # Calculate timestamp (milliseconds since midnight)
+    timestamp_ms = int(hh) * 3600000 + int(mm) * 60000 + int(ss) * 1000 + int(ms)
 
     # Compress tag (task name)
     compressed_tag = COMPRESSION_DICT.get(tag, tag)
 
-    # Compress message content (apply all replacements with word boundaries)
-    compressed_msg = message
-    for original, replacement in COMPRESSION_DICT.items():
-        # Use word boundaries for multi-word phrases, simple replace for single words
-        if ' ' in original:
-            # Multi-word phrase - exact match
-            compressed_msg = compressed_msg.replace(original, replacement)
-        else:
-            # Single word - use word boundaries to avoid partial matches
-            # But allow matches in compound words (e.g., "initialized")
-            pattern = re.compile(r'\b' + re.escape(original) + r'\b')
-            compressed_msg = pattern.sub(replacement, compressed_msg)
+    # Compress message content (all replacements in a single regex pass)
+    compressed_msg = compress_message(message)
 
     # Format compressed line
     if base_timestamp_ms is None:
         # First line - use absolute timestamp
         time_str = f"{hh}:{mm}:{ss}.{ms}"
     else:
-        # Delta encoding
-        delta_ms = timestamp_ms - base_timestamp_ms
-        if delta_ms >= 0:
-            time_str = f"+{delta_ms}"
-        else:
-            time_str = f"{delta_ms}"
+        # Delta encoding (always signed, e.g. +231 or -5)
+        time_str = f"{timestamp_ms - base_timestamp_ms:+d}"
 
     compressed_line = f"{time_str} {level} ({tick}) {compressed_tag}: {compressed_msg}"
 
     return compressed_line, timestamp_ms
 
 
-def decompress_line(compressed_line, reverse_dict, base_timestamp_ms):
+def decompress_line(compressed_line, base_timestamp_ms):
     """
     Decompress a line back to original format (for validation).
 
@@ -195,19 +220,18 @@ def decompress_line(compressed_line, reverse_dict, base_timestamp_ms):
         str: Decompressed line
     """
     # Parse compressed format
-    match = re.match(r'^(\+?-?\d+(?::\d{2}:\d{2}\.\d{3})?)\s+([IWED])\s+\((\d+)\)\s+(\w+):\s+(.*)$', compressed_line)
+    match = COMPRESSED_LOG_PATTERN.match(compressed_line)
     if not match:
         return None
 
     time_str, level, tick, tag, message = match.groups()
 
     # Decompress tag
-    decompressed_tag = reverse_dict.get(tag, tag)
+    decompressed_tag = REVERSE_COMPRESSION_DICT.get(tag, tag)
 
-    # Decompress message
-    decompressed_msg = message
-    for compressed, original in reverse_dict.items():
-        decompressed_msg = decompressed_msg.replace(compressed, original)
+    # Decompress message (single regex pass)
+    decompressed_msg = DECOMPRESSION_PATTERN.sub(
+        lambda m: REVERSE_COMPRESSION_DICT[m.group(0)], message)
 
     # Reconstruct timestamp (approximate - just for validation structure)
     if ':' in time_str:
@@ -226,23 +250,27 @@ def decompress_line(compressed_line, reverse_dict, base_timestamp_ms):
     return f"{timestamp} > I ({tick}) {decompressed_tag}: {decompressed_msg}"
 
 
-def parse_log_file(input_path):
+class LogReadError(Exception):
+    """Raised when the input log fails to read while it is being streamed."""
+
+
+def iter_compressed_lines(input_path, stats):
     """
-    Parse and compress serial log file.
+    Compress serial log file one line at a time.
 
-    Returns:
-        tuple: (compressed_lines, base_timestamp_info, stats)
+    Line counts and the base timestamp are recorded in stats as the
+    file is consumed. I/O errors on the input are raised as LogReadError,
+    so a consumer that is writing output can tell them apart from its own.
+
+    Yields:
+        str: Compressed log line
     """
-    compressed_lines = []
     base_timestamp_ms = None
-    base_timestamp_str = None
-    original_lines_count = 0
-    processed_lines_count = 0
 
     try:
         with open(input_path, 'r', encoding='utf-8', errors='ignore') as f:
             for line in f:
-                original_lines_count += 1
+                stats['original_lines'] += 1
                 line = line.rstrip()
 
                 # Skip empty lines
@@ -256,26 +284,45 @@ def parse_log_file(input_path):
                     # Set base timestamp from first line
                     if base_timestamp_ms is None:
                         base_timestamp_ms = timestamp_ms
-                        base_timestamp_str = compressed_line.split()[0]
+                        stats['base_timestamp'] = compressed_line.split()[0]
+                        stats['base_timestamp_ms'] = timestamp_ms
 
-                    compressed_lines.append(compressed_line)
-                    processed_lines_count += 1
+                    stats['processed_lines'] += 1
+                    yield compressed_line
+    except OSError as e:
+        raise LogReadError(e) from e
 
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        return None, None, None
 
+def parse_log_file(input_path, sample_count=5):
+    """
+    Parse and compress serial log file.
+
+    Only the first sample_count compressed lines are held in memory (for
+    validation); the rest are compressed lazily as the returned iterator
+    is consumed, and stats is complete once it is exhausted.
+
+    Returns:
+        tuple: (compressed_lines, sample_lines, stats)
+    """
     stats = {
-        'original_lines': original_lines_count,
-        'processed_lines': processed_lines_count,
-        'base_timestamp': base_timestamp_str,
-        'base_timestamp_ms': base_timestamp_ms
+        'original_lines': 0,
+        'processed_lines': 0,
+        'base_timestamp': None,
+        'base_timestamp_ms': None
     }
 
-    return compressed_lines, base_timestamp_str, stats
+    compressed_lines = iter_compressed_lines(input_path, stats)
+
+    try:
+        sample_lines = list(islice(compressed_lines, sample_count))
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        return None, None, None
+
+    return chain(sample_lines, compressed_lines), sample_lines, stats
 
 
-def validate_compression(sample_lines, reverse_dict, base_timestamp_ms):
+def validate_compression(sample_lines, base_timestamp_ms):
     """
     Validate that compression is reversible (test round-trip).
 
@@ -288,7 +335,7 @@ def validate_compression(sample_lines, reverse_dict, base_timestamp_ms):
     # Test first few lines
     test_count = min(5, len(sample_lines))
     for i, compressed_line in enumerate(sample_lines[:test_count]):
-        decompressed = decompress_line(compressed_line, reverse_dict, base_timestamp_ms)
+        decompressed = decompress_line(compressed_line, base_timestamp_ms)
         if decompressed is None:
             print(f"WARNING: Line {i+1} failed to decompress")
             return False
@@ -299,9 +346,17 @@ def validate_compression(sample_lines, reverse_dict, base_timestamp_ms):
 def write_compressed_output(output_path, compressed_lines, base_timestamp_str, stats):
     """
     Write compressed output with embedded dictionary header.
+
+    compressed_lines may be any iterable; lines are written as they arrive.
+    Output goes to a temporary file that replaces output_path only once
+    everything is written. A LogReadError from compressed_lines is re-raised
+    (after discarding the partial output) for the caller to report.
     """
+    output_path = Path(output_path)
+    temp_path = output_path.with_name(output_path.name + '.tmp')
+
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with open(temp_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
             # Write header with compression dictionary
             f.write("# ===================================================================\n")
             f.write("# COMPRESSED ESP32 SERIAL LOG - Token-Efficient Format\n")
@@ -327,13 +382,18 @@ def write_compressed_output(output_path, compressed_lines, base_timestamp_str, s
             f.write("# ===================================================================\n")
             f.write("\n")
 
-            # Write compressed log lines
-            for line in compressed_lines:
-                f.write(line + '\n')
+            # Write compressed log lines (1 MiB buffer batches the underlying writes)
+            f.writelines(line + '\n' for line in compressed_lines)
 
+        temp_path.replace(output_path)
         return True
 
+    except LogReadError:
+        temp_path.unlink(missing_ok=True)
+        raise
+
     except Exception as e:
+        temp_path.unlink(missing_ok=True)
         print(f"Error writing output file: {e}")
         return False
 
@@ -360,7 +420,7 @@ def main():
     print("This may take a moment for large files...")
 
     # Parse and compress log file
-    compressed_lines, base_timestamp_str, stats = parse_log_file(input_path)
+    compressed_lines, sample_lines, stats = parse_log_file(input_path)
 
     if compressed_lines is None:
         print("Failed to parse log file.")
@@ -368,9 +428,8 @@ def main():
         sys.exit(1)
 
     # Validate compression (round-trip test)
-    reverse_dict = {v: k for k, v in COMPRESSION_DICT.items()}
     print("Validating compression (round-trip test)...")
-    if not validate_compression(compressed_lines, reverse_dict, stats['base_timestamp_ms']):
+    if not validate_compression(sample_lines, stats['base_timestamp_ms']):
         print("WARNING: Compression validation failed!")
         print("Some data may not be reversible. Proceeding anyway...")
 
@@ -379,7 +438,15 @@ def main():
 
     # Write compressed output
     print("Writing compressed output...")
-    if not write_compressed_output(output_path, compressed_lines, base_timestamp_str, stats):
+    try:
+        written = write_compressed_output(output_path, compressed_lines, stats['base_timestamp'], stats)
+    except LogReadError as e:
+        print(f"Error reading file: {e}")
+        print("Failed to parse log file.")
+        input("Press Enter to exit...")
+        sys.exit(1)
+
+    if not written:
         print("Failed to write output file.")
         input("Press Enter to exit...")
         sys.exit(1)
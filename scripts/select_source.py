@@ -11,6 +11,7 @@ This solves the "multiple definition of app_main" error when building test envir
 
 Import("env")
 import os
+import zlib
 
 # Get the current build environment name
 build_env = env["PIOENV"]
@@ -155,9 +156,13 @@ idf_component_register(
 # Path to src/CMakeLists.txt
 cmake_path = os.path.join(env["PROJECT_DIR"], "src", "CMakeLists.txt")
 
+# Stamp recording which environment/content CMakeLists.txt was last generated for
+stamp_path = os.path.join(env["PROJECT_DIR"], "src", ".select_source.stamp")
+
 # Generate appropriate CMakeLists.txt based on build type
 if build_env in MODULAR_BUILDS:
     # Modular build - use all module files
+    source_file = "modular"
     cmake_content = MODULAR_CMAKE_TEMPLATE
     print(f"[BUILD] Generating MODULAR CMakeLists.txt for {build_env}")
 else:
@@ -166,8 +171,35 @@ else:
     cmake_content = TEST_CMAKE_TEMPLATE.format(source_file=source_file)
     print(f"[BUILD] Generating TEST CMakeLists.txt for {build_env}: {source_file}")
 
-# Write the generated CMakeLists.txt
-with open(cmake_path, 'w') as f:
-    f.write(cmake_content)
+# Checksum of the template output, so edits to this script also invalidate the stamp
+stamp = f"{build_env}:{source_file}:{zlib.crc32(cmake_content.encode()):08x}"
+
+# Skip all file work when the stamp matches and CMakeLists.txt hasn't been touched since
+try:
+    stamp_current = os.path.getmtime(cmake_path) <= os.path.getmtime(stamp_path)
+    if stamp_current:
+        with open(stamp_path, 'r') as f:
+            stamp_current = f.read() == stamp
+except OSError:
+    stamp_current = False
 
-print(f"[BUILD] CMakeLists.txt generation complete")
+if stamp_current:
+    print(f"[BUILD] CMakeLists.txt already up to date for {build_env}")
+else:
+    # Read the current CMakeLists.txt (if any) to compare against
+    try:
+        with open(cmake_path, 'r') as f:
+            existing_content = f.read()
+    except FileNotFoundError:
+        existing_content = None
+
+    # Only write when the content changed, so CMake doesn't reconfigure on every build
+    if cmake_content != existing_content:
+        with open(cmake_path, 'w') as f:
+            f.write(cmake_content)
+        print(f"[BUILD] CMakeLists.txt generation complete")
+    else:
+        print(f"[BUILD] CMakeLists.txt unchanged, skipping write")
+
+    with open(stamp_path, 'w') as f:
+        f.write(stamp)